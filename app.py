@@ -1,12 +1,55 @@
+import asyncio
+import codecs
+import hashlib
+import os
+import re
+
+# Size the OpenMP/MKL pools to every core before any torch-backed library is imported
+os.environ.setdefault('OMP_NUM_THREADS', str(os.cpu_count()))
+os.environ.setdefault('MKL_NUM_THREADS', str(os.cpu_count()))
+
+import ahocorasick
+import aiohttp
+import numpy as np
 import streamlit as st
-from sentence_transformers import SentenceTransformer, util
+import torch
 from keybert import KeyBERT
+from sentence_transformers import SentenceTransformer
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer
+
+from onnx_encoder import load_optimized_encoder, load_quantized_encoder
+
+# Use every core and route CPU GEMMs through oneDNN (relaxed FP32 matmul precision)
+torch.set_num_threads(os.cpu_count())
+try:
+    torch.set_num_interop_threads(2)
+except RuntimeError:
+    pass  # Can only be set once per process; Streamlit reruns this script on every interaction
+torch.backends.mkldnn.enabled = True
+torch.set_float32_matmul_precision('medium')
 
 # --- CONFIGURATION ---
 PAGE_TITLE = "SEO Semantic Auditor (URL vs URL)"
 MODEL_NAME = "all-mpnet-base-v2"
+FAST_MODEL_NAME = "all-MiniLM-L6-v2"  # 6 layers / 384 dims: ~5x less compute, slightly lower quality
+# "onnx-int8" (INT8 ONNX Runtime), "onnx" (FP32 ONNX Runtime with graph fusions)
+# or "torch" (BF16 where the CPU supports it)
+ENCODER_BACKEND = "onnx-int8"
+ONNX_CACHE_DIR = "onnx_models"  # ONNX exports live here so cold starts skip re-exporting
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"  # A GPU always wins over the CPU backends
+ENCODE_BATCH_SIZE = 128 if DEVICE == "cuda" else 64
+# Candidate n-gram embeddings kept per model before the cache is reset
+# (10,000 x 768 float32 is ~30 MB for mpnet, resident for the life of the process)
+PHRASE_CACHE_SIZE = 10000
+# Candidate n-gram settings shared by every extraction; cloned per call because fitting mutates it
+KEYPHRASE_VECTORIZER = CountVectorizer(ngram_range=(1, 2), stop_words='english')
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
+PARSE_CHUNK_SIZE = 64 * 1024  # HTML is fed to the parser in pieces so read nodes can be freed early
 
 st.set_page_config(page_title=PAGE_TITLE, layout="wide")
 
@@ -18,49 +61,252 @@ if 'competitor_text' not in st.session_state:
     st.session_state['competitor_text'] = ""
 
 # --- 2. LOAD MODELS (Cached) ---
+def load_torch_encoder(model_name, device="cpu"):
+    """SentenceTransformer in FP16 on GPU; on CPU in BF16 when AVX-512 BF16 is native."""
+    if device == "cuda":
+        return SentenceTransformer(model_name, device=device).half()
+
+    sentence_model = SentenceTransformer(model_name, device=device)
+    if torch.cpu._is_avx512_bf16_supported():
+        # encode() upcasts BF16 back to FP32 numpy, so the scores keep full precision
+        sentence_model = sentence_model.to(torch.bfloat16)
+    return sentence_model
+
 @st.cache_resource
-def load_models():
-    sentence_model = SentenceTransformer(MODEL_NAME)
+def load_models(model_name):
+    # Cached per model name, so switching quality modes back and forth doesn't reload anything
+    if DEVICE == "cuda" or ENCODER_BACKEND == "torch":
+        sentence_model = load_torch_encoder(model_name, DEVICE)
+    elif ENCODER_BACKEND == "onnx":
+        sentence_model = load_optimized_encoder(model_name, ONNX_CACHE_DIR)
+    else:
+        sentence_model = load_quantized_encoder(model_name, ONNX_CACHE_DIR)
     kw_model = KeyBERT(model=sentence_model)
     return sentence_model, kw_model
 
+quality = st.sidebar.radio(
+    "Quality",
+    ["Accurate", "Fast"],
+    help="Fast uses a smaller distilled encoder (all-MiniLM-L6-v2): much quicker, slightly less precise."
+)
+model_name = FAST_MODEL_NAME if quality == "Fast" else MODEL_NAME
+
 with st.spinner(f"Loading AI Brains..."):
-    model, kw_model = load_models()
+    model, kw_model = load_models(model_name)
 
 # --- 3. HELPER FUNCTIONS ---
+def resolve_charset(label):
+    """Python codec name for a charset label from the HTTP headers, or None if it isn't a known codec."""
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip(';\'"')).name
+        b"x".decode(name, errors="replace")  # Also rejects non-text codecs such as base64
+        return name
+    except LookupError:
+        return None
+
+def _read_page_texts(parser):
+    for _, elem in parser.read_events():
+        # One C-level text serialization per element (tail excluded: it belongs to the parent)
+        text = etree.tostring(elem, method='text', encoding='unicode', with_tail=False).strip()
+        # Filter out short snippets (like menu items)
+        if len(text) > 25:
+            yield text
+        elem.clear(keep_tail=True)
+
+def parse_page_text(content, charset=None):
+    """Extracts the significant text from raw HTML bytes (`charset` from the HTTP headers, if any)."""
+    # Decode in Python so unusual charset labels never reach libxml2, and parse the decoded text itself
+    charset = resolve_charset(charset)
+    if charset is not None:
+        content = content.decode(charset, errors='replace')
+    else:
+        # libxml2 assumes Latin-1 for undeclared pages; valid UTF-8 is far more likely to be UTF-8
+        try:
+            content = content.decode('utf-8')
+        except UnicodeDecodeError:
+            pass  # Feed the bytes and let libxml2 fall back to the page's <meta charset>
+
+    texts = []
+    # Stream only significant text (paragraphs and headers), clearing each node once read
+    parser = etree.HTMLPullParser(events=('end',), tag=('p', 'h1', 'h2', 'h3', 'li'))
+    for start in range(0, len(content), PARSE_CHUNK_SIZE):
+        parser.feed(content[start:start + PARSE_CHUNK_SIZE])
+        texts.extend(_read_page_texts(parser))
+    try:
+        parser.close()
+        texts.extend(_read_page_texts(parser))
+    except etree.XMLSyntaxError:
+        pass  # No elements at all (e.g. an empty body): keep whatever was extracted, usually ""
+    return " ".join(texts)
+
+@st.cache_resource
+def get_http_session():
+    """One pooled keep-alive session for the whole process (module globals reset on every rerun)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=Retry(total=2, backoff_factor=0.2), pool_connections=4, pool_maxsize=8)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def download_page_text(url):
+    """Downloads and cleans a URL through the pooled session."""
+    response = get_http_session().get(url, headers=HEADERS, timeout=10)
+    response.raise_for_status()
+    # response.encoding defaults to Latin-1 for text/html, so only trust an explicit charset
+    charset = response.encoding if 'charset=' in response.headers.get('content-type', '').lower() else None
+    return parse_page_text(response.content, charset)
+
+class _NotCached(Exception):
+    pass
+
+def _raise_not_cached(url):
+    raise _NotCached(url)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_page_text(url, _load):
+    """Clean text for `url`, cached for an hour and shared by both fetch paths.
+
+    On a miss `_load(url)` produces the text; exceptions (failed fetches) are not cached.
+    """
+    return _load(url)
+
 def fetch_url_content(url):
     """Fetches clean text from a URL."""
     try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Grab only significant text (paragraphs and headers)
-        text_elements = soup.find_all(['p', 'h1', 'h2', 'h3', 'li'])
-        # Filter out short snippets (like menu items)
-        extracted_text = " ".join([elem.get_text().strip() for elem in text_elements if len(elem.get_text().strip()) > 25])
-        return extracted_text
+        return cached_page_text(url, download_page_text)
     except Exception as e:
         st.error(f"Error fetching URL: {e}")
         return None
 
-def extract_keywords(text, top_n=20):
-    if not text: 
-        return []
+async def _fetch(session, url):
+    async with session.get(url, headers=HEADERS, timeout=aiohttp.ClientTimeout(total=10)) as response:
+        response.raise_for_status()
+        return await response.read(), response.charset
+
+async def _fetch_all(urls):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=8)) as session:
+        return await asyncio.gather(*(_fetch(session, url) for url in urls), return_exceptions=True)
+
+def fetch_url_contents(urls):
+    """Fetches several URLs concurrently. Returns clean text (or None on error) per URL."""
+    texts = {}
+    misses = []
+    for url in urls:
+        # Probe the page cache without loading; only the misses go to the network
+        try:
+            texts[url] = cached_page_text(url, _raise_not_cached)
+        except _NotCached:
+            if url not in misses:
+                misses.append(url)
+
+    if misses:
+        for url, result in zip(misses, asyncio.run(_fetch_all(misses))):
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                text = parse_page_text(*result)
+                # Fill the cache so the single-page buttons (and the next Fetch Both) reuse it
+                texts[url] = cached_page_text(url, lambda _url: text)
+            except Exception as e:
+                st.error(f"Error fetching {url}: {e}")
+                texts[url] = None
+    return [texts[url] for url in urls]
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode()).hexdigest()
+
+# Cached helpers take the model name so Fast and Accurate embeddings never mix
+@st.cache_data(max_entries=512)
+def _encode_by_hash(model_name, digest, _text):
+    # Streamlit skips hashing underscore-prefixed args, so the digest identifies the text
+    return model.encode(_text, normalize_embeddings=True, convert_to_numpy=True)
+
+def encode_text(text):
+    """Embeds a text, reusing the embedding across reruns while the text is unchanged."""
+    return _encode_by_hash(model_name, text_hash(text), text)
+
+@st.cache_data(max_entries=2048)
+def encode_kw(model_name, keyword):
+    """Embeds a (normalized) keyword; small and frequently repeated, so it gets its own larger cache."""
+    return model.encode(keyword, normalize_embeddings=True, convert_to_numpy=True)
+
+@st.cache_resource
+def get_phrase_cache(model_name):
+    return {}
+
+def encode_phrases(phrases):
+    """Embeds candidate n-grams, only running the encoder on phrases this model hasn't seen yet."""
+    cache = get_phrase_cache(model_name)
+    # Collect hits into a local mapping first: the shared dict may be cleared (here or by
+    # another session) before we're done, so the result must never be read back from it
+    found = {}
+    for phrase in phrases:
+        embedding = cache.get(phrase)
+        if embedding is not None:
+            found[phrase] = embedding
+    new_phrases = [phrase for phrase in phrases if phrase not in found]
+    if new_phrases:
+        embeddings = model.encode(new_phrases, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True)
+        fresh = dict(zip(new_phrases, embeddings))
+        found.update(fresh)
+        if len(cache) + len(fresh) > PHRASE_CACHE_SIZE:
+            # Start over, keeping this call's phrases as the new working set
+            cache.clear()
+            fresh = found
+        cache.update(fresh)
+    return np.vstack([found[phrase] for phrase in phrases])
+
+@st.cache_data(max_entries=64)
+def _extract_keywords_by_hash(model_name, digests, _texts, top_n):
+    vectorizer = clone(KEYPHRASE_VECTORIZER)
+    candidates = vectorizer.fit(_texts).get_feature_names_out().tolist()
+    doc_embeddings = np.vstack([encode_text(text) for text in _texts])
+    word_embeddings = encode_phrases(candidates)
+
+    keywords = kw_model.extract_keywords(
+        _texts,
+        vectorizer=vectorizer,
+        top_n=top_n,
+        use_mmr=True,
+        diversity=0.3,
+        doc_embeddings=doc_embeddings,
+        word_embeddings=word_embeddings
+    )
+    # KeyBERT only nests the results when given more than one document
+    return keywords if len(_texts) > 1 else [keywords]
+
+def extract_keywords(texts, top_n=20):
+    """Extracts keywords for several documents with one shared candidate pass.
+
+    Document embeddings come from the rerun cache and every candidate n-gram is
+    embedded in one batch, then handed to KeyBERT so it only does the MMR ranking.
+    Results are cached per set of texts, so re-analyzing unchanged pages skips KeyBERT.
+    """
+    if not all(texts):
+        return [[] for _ in texts]
     try:
-        keywords = kw_model.extract_keywords(
-            text, 
-            keyphrase_ngram_range=(1, 2), 
-            stop_words='english', 
-            top_n=top_n,
-            use_mmr=True,
-            diversity=0.3
-        )
-        return keywords
+        return _extract_keywords_by_hash(model_name, tuple(text_hash(text) for text in texts), list(texts), top_n)
     except Exception as e:
         st.error(f"KeyBERT extraction error: {str(e)}")
-        return []
+        return [[] for _ in texts]
+
+def find_covered_keywords(keywords, text):
+    """Returns the keywords found in `text`: single words as whole tokens, phrases as substrings."""
+    text_lower = text.lower()
+    tokens = set(re.findall(r"\w+", text_lower))
+    covered = {kw for kw in keywords if " " not in kw and kw.lower() in tokens}
+
+    # Match every phrase in a single Aho-Corasick pass instead of one scan per phrase
+    automaton = ahocorasick.Automaton()
+    for kw in keywords:
+        if " " in kw:
+            automaton.add_word(kw.lower(), kw)
+    if len(automaton):
+        automaton.make_automaton()
+        covered.update(kw for _, kw in automaton.iter(text_lower))
+    return covered
 
 # --- 4. THE INTERFACE ---
 st.title("⚔️ " + PAGE_TITLE)
@@ -117,6 +363,20 @@ with col_mine:
         placeholder="Paste your content here or fetch from URL above..."
     )
 
+# Both pages at once: the two downloads run concurrently
+if st.button("Fetch Both Pages", type="secondary", key="fetch_both"):
+    if comp_url and my_url:
+        with st.spinner("Fetching both pages..."):
+            comp_text, my_text = fetch_url_contents([comp_url, my_url])
+            if comp_text:
+                st.session_state['competitor_text'] = comp_text
+            if my_text:
+                st.session_state['my_text'] = my_text
+            if comp_text and my_text:
+                st.rerun()
+    else:
+        st.warning("⚠️ Please provide both URLs.")
+
 # --- BOTTOM: ACTION & RESULTS ---
 st.divider()
 analyze_btn = st.button("🚀 Analyze Semantic Gap", type="primary", use_container_width=True)
@@ -127,11 +387,19 @@ if analyze_btn:
     elif not my_content_final or len(my_content_final.strip()) < 50:
         st.warning("⚠️ Please fetch or paste 'My Page' content (at least 50 characters).")
     else:
+        # Page texts rarely change between clicks; when only the keyword did, reuse this session's results
+        h_my = (model_name, text_hash(my_content_final))
+
         # 1. SCORING
         with st.spinner("🔍 Analyzing semantic similarity..."):
-            emb_kw = model.encode(target_keyword, convert_to_tensor=True)
-            emb_my = model.encode(my_content_final, convert_to_tensor=True)
-            score = float(util.cos_sim(emb_kw, emb_my)[0][0])
+            # The mpnet tokenizer lowercases anyway, so normalizing only improves cache hits
+            emb_kw = encode_kw(model_name, target_keyword.strip().lower())
+            if st.session_state.get('h_my') != h_my:
+                st.session_state['emb_my'] = encode_text(my_content_final)
+                st.session_state['h_my'] = h_my
+            emb_my = st.session_state['emb_my']
+            # Unit-length vectors: cosine similarity is just the dot product
+            score = float(emb_kw @ emb_my)
         
         # 2. DISPLAY SCORE
         st.markdown("### 📊 Semantic Proximity Score")
@@ -155,16 +423,23 @@ if analyze_btn:
             st.markdown("### 🕵️‍♀️ Keyword Gap Analysis")
             
             try:
-                # Extract Top Keywords
-                st.write("Extracting keywords from competitor page...")
-                comp_kws = [kw[0] for kw in extract_keywords(st.session_state['competitor_text'], top_n=25)]
-                
-                st.write("Extracting keywords from your page...")
-                my_kws = [kw[0] for kw in extract_keywords(my_content_final, top_n=25)]
+                # Extract Top Keywords (both pages in one pass)
+                h_pages = h_my + (text_hash(st.session_state['competitor_text']),)
+                if st.session_state.get('h_pages') != h_pages:
+                    st.write("Extracting keywords from competitor page and your page...")
+                    comp_result, my_result = extract_keywords([st.session_state['competitor_text'], my_content_final], top_n=25)
+                    st.session_state['comp_kws'] = [kw[0] for kw in comp_result]
+                    st.session_state['my_kws'] = [kw[0] for kw in my_result]
+                    # An empty result means extraction failed; let the next click retry
+                    st.session_state['h_pages'] = h_pages if comp_result else None
+                comp_kws = st.session_state['comp_kws']
+                my_kws = st.session_state['my_kws']
                 
                 # Find Missing
                 # Logic: Words in Competitor list that are NOT in my text at all
-                missing_kws = [kw for kw in comp_kws if kw.lower() not in my_content_final.lower()]
+                covered = find_covered_keywords(comp_kws, my_content_final)
+                shared = [kw for kw in comp_kws if kw in covered]
+                missing_kws = [kw for kw in comp_kws if kw not in covered]
                 
                 col_gap1, col_gap2 = st.columns(2)
                 
@@ -181,8 +456,7 @@ if analyze_btn:
                 with col_gap2:
                     st.info(f"SHARED TOPICS")
                     st.caption("You both cover these concepts:")
-                    # Intersection
-                    shared = [kw for kw in comp_kws if kw.lower() in my_content_final.lower()]
+                    # Intersection (computed above)
                     if shared:
                         st.write(", ".join(shared))
                     else:
@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+import onnxruntime as ort
+from keybert.backend import BaseEmbedder
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTOptimizer
+from optimum.onnxruntime.configuration import AutoOptimizationConfig
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
+
+EXPORTED_FILE = "model.onnx"
+QUANTIZED_FILE = "model_quantized.onnx"
+OPTIMIZED_FILE = "model_optimized.onnx"
+
+
+class OnnxEncoder(BaseEmbedder):
+    """Drop-in replacement for SentenceTransformer backed by an ONNX Runtime session.
+
+    Reproduces the mpnet pipeline (mean pooling + L2 normalization), so the
+    embeddings are unit-length and cosine similarity is a plain dot product.
+    Subclasses KeyBERT's BaseEmbedder: KeyBERT silently swaps in its default
+    model for any object it doesn't recognise, so `.encode()` alone is not enough.
+    """
+
+    def __init__(self, model_dir, onnx_file=QUANTIZED_FILE):
+        super().__init__()
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, use_fast=True)
+        with open(os.path.join(model_dir, "sentence_bert_config.json")) as f:
+            self.max_seq_length = json.load(f)["max_seq_length"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = os.cpu_count()
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, onnx_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, **kwargs):
+        """Same call shape as SentenceTransformer.encode; always returns normalized numpy arrays."""
+        single = isinstance(sentences, str)
+        # KeyBERT hands over its candidates as a numpy array; the tokenizer wants a plain list
+        sentences = [sentences] if single else list(sentences)
+        if not sentences:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        # Smart batching: tokenize once, then group by token count so short phrases
+        # aren't padded to the length of a full document
+        encoded = self.tokenizer(sentences, truncation=True, max_length=self.max_seq_length)
+        order = np.argsort([-len(ids) for ids in encoded["input_ids"]], kind="stable")
+
+        batches = []
+        for start in range(0, len(order), batch_size):
+            features = [{key: encoded[key][i] for key in encoded.keys()} for i in order[start:start + batch_size]]
+            tokens = self.tokenizer.pad(features, padding="longest", return_tensors="np")
+            token_embeddings = self.session.run(None, {name: tokens[name] for name in self.input_names})[0]
+
+            # Mean pooling over real tokens only (ignore padding)
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled / np.linalg.norm(pooled, axis=1, keepdims=True))
+
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)
+        return embeddings[0] if single else embeddings
+
+    def similarity(self, a, b):
+        """Cosine similarity matrix; inputs are already unit-length."""
+        return np.atleast_2d(a) @ np.atleast_2d(b).T
+
+    def embed(self, documents, verbose=False):
+        """KeyBERT backend hook."""
+        return self.encode(documents, show_progress_bar=verbose)
+
+
+def export_onnx_model(model_name, cache_root):
+    """Exports `model_name` to ONNX on first use and returns the directory holding it."""
+    model_dir = os.path.join(cache_root, model_name)
+    if not os.path.exists(os.path.join(model_dir, EXPORTED_FILE)):
+        # Saving the SentenceTransformer gives us the tokenizer and max_seq_length alongside the weights
+        SentenceTransformer(model_name).save(model_dir)
+        ORTModelForFeatureExtraction.from_pretrained(model_dir, export=True).save_pretrained(model_dir)
+    return model_dir
+
+
+def load_quantized_encoder(model_name, cache_root):
+    """Quantizes the ONNX export to INT8 on first use, then reuses the file on disk."""
+    model_dir = export_onnx_model(model_name, cache_root)
+    if not os.path.exists(os.path.join(model_dir, QUANTIZED_FILE)):
+        quantize_dynamic(
+            os.path.join(model_dir, EXPORTED_FILE),
+            os.path.join(model_dir, QUANTIZED_FILE),
+            weight_type=QuantType.QInt8
+        )
+    return OnnxEncoder(model_dir)
+
+
+def load_optimized_encoder(model_name, cache_root):
+    """FP32 ONNX export with O3 graph fusions (LayerNorm, GELU, attention); no quantization loss."""
+    model_dir = export_onnx_model(model_name, cache_root)
+    if not os.path.exists(os.path.join(model_dir, OPTIMIZED_FILE)):
+        optimizer = ORTOptimizer.from_pretrained(model_dir, file_names=[EXPORTED_FILE])
+        optimizer.optimize(AutoOptimizationConfig.O3(), save_dir=model_dir, file_suffix="optimized")
+    return OnnxEncoder(model_dir, onnx_file=OPTIMIZED_FILE)
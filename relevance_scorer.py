@@ -1,8 +1,8 @@
-from sentence_transformers import SentenceTransformer
+from onnx_encoder import load_quantized_encoder
 
 def main():
     # Load model once
-    model = SentenceTransformer('all-mpnet-base-v2')
+    model = load_quantized_encoder('all-mpnet-base-v2', 'onnx_models')
 
     while True:
         print("\n" + "="*50)
@@ -26,10 +26,11 @@ def main():
 
         # 3. Calculate Score
         # We encode individually to compare 1-to-1
-        keyword_emb = model.encode(target_keyword)
-        content_emb = model.encode(content_text)
+        keyword_emb = model.encode(target_keyword, normalize_embeddings=True, convert_to_numpy=True)
+        content_emb = model.encode(content_text, normalize_embeddings=True, convert_to_numpy=True)
         
-        score = model.similarity(keyword_emb, content_emb).item()
+        # Both vectors are unit-length, so the dot product is the cosine similarity
+        score = float(keyword_emb @ content_emb)
         
         # 4. Give Feedback
         print(f"\n>>> Semantic Score: {score:.4f}")